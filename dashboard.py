@@ -1,18 +1,25 @@
 import os
+import re
+import time
 import logging
 import asyncio
+import functools
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 from dotenv import load_dotenv
 import aiohttp
+import orjson
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import pytz
 import telegram
 
 # --- Настройки ---
 BOT_NAME = "dashboard"
+_SYMBOLS = ("BTC", "ETH", "XRP")
+_SYMBOL_TO_CG = {"BTC": "bitcoin", "ETH": "ethereum", "XRP": "ripple"}
 
 # --- Переменные окружения ---
 load_dotenv()
@@ -20,261 +27,443 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
 ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
 COINGLASS_API_KEY = os.getenv("COINGLASS_API_KEY")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
-MOSCOW_TZ = pytz.timezone("Europe/Moscow")
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+_NOW = functools.partial(datetime.now, MOSCOW_TZ)
 
 # --- Логирование ---
+_LOG_LEVEL_VALID = LOG_LEVEL in logging.getLevelNamesMapping()
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
+    level=LOG_LEVEL if _LOG_LEVEL_VALID else logging.INFO
 )
 logger = logging.getLogger(BOT_NAME)
+if not _LOG_LEVEL_VALID:
+    logger.warning("Неизвестный LOG_LEVEL=%r, используется INFO.", LOG_LEVEL)
+
+# Общая HTTP-сессия: пул соединений переиспользуется между запросами ко всем API
+_HTTP: aiohttp.ClientSession | None = None
+
+_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+# Пустая запись монеты: поля, которые не удалось получить, остаются N/A
+_EMPTY = {
+    "current_price": "N/A",
+    "change_24h": "N/A",
+    "volume_24h": "N/A",
+    "open_interest": "N/A",
+    "long_liquidations_24h": "N/A",
+    "short_liquidations_24h": "N/A",
+    "total_liquidations_24h": "N/A",
+}
+
+# Кэш ответов API: (имя функции, аргументы) -> (момент истечения по time.monotonic(), результат)
+_CACHE = {}
 
 
 # --- Функции для сбора данных ---
+def _http_session():
+    global _HTTP
+    if _HTTP is None or _HTTP.closed:
+        # limit_per_host — только ограничение одновременных соединений с одним хостом:
+        # 6 = 3 монеты x 2 запроса Coinglass. Если автопостинг, /test и /report совпадут,
+        # лишние запросы подождут в очереди, а не откроют до 18 соединений к Coinglass
+        _HTTP = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=6,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+        )
+    return _HTTP
+
+def _ttl_cached(ttl=60, negative_ttl=10, is_failure=lambda result: result is None):
+    """Кэширует результат корутины на ttl секунд, а неудачный (по is_failure) — на negative_ttl."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            cached = _CACHE.get(key)
+            if cached and time.monotonic() < cached[0]:
+                return cached[1]
+            result = await func(*args, **kwargs)
+            expires_at = time.monotonic() + (negative_ttl if is_failure(result) else ttl)
+            _CACHE[key] = (expires_at, result)
+            return result
+        return wrapper
+    return decorator
+
+async def _gather_or_none(*coros):
+    """Выполняет запросы параллельно; упавший запрос превращается в None."""
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Ошибка при параллельном получении данных: %s", result)
+    return [None if isinstance(result, Exception) else result for result in results]
+
+async def _get_json(session, url, headers=None, params=None, *, tries=3, backoff=0.3):
+    """GET-запрос с повторами при сетевых ошибках, таймаутах и ответах 5xx."""
+    for attempt in range(tries):
+        try:
+            async with session.get(url, headers=headers, params=params, timeout=_REQUEST_TIMEOUT) as response:
+                if response.status < 500 or attempt == tries - 1:
+                    response.raise_for_status()
+                    return orjson.loads(await response.read())
+                error = f"HTTP {response.status}"
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == tries - 1:
+                raise
+            error = repr(e)
+        logger.warning("Запрос к %s не удался (%s), попытка %d/%d. Повтор...", url, error, attempt + 1, tries)
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+def _api_record(payload, *path):
+    """Достает из ответа API вложенный словарь по ключам и индексам path.
+
+    Возвращает None, если по пути встретился не тот тип (например, словарь вместо
+    списка) или запись пуста: вызывающий код тогда оставляет свои поля N/A.
+    """
+    node = payload
+    for key in path:
+        if isinstance(key, int):
+            node = node[key] if isinstance(node, list) and -len(node) <= key < len(node) else None
+        else:
+            node = node.get(key) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) and node else None
+
+def _coinglass_record(payload, *path):
+    """Запись из ответа Coinglass вида {"success": true, "data": ...} либо None."""
+    if not (isinstance(payload, dict) and payload.get("success")):
+        return None
+    return _api_record(payload, "data", *path)
+
+def _log_coinglass_error(symbol, error):
+    if isinstance(error, aiohttp.ClientError):
+        logger.error("Ошибка HTTP клиента при запросе к Coinglass API для %s: %s", symbol, error)
+    else:
+        logger.error("Неизвестная ошибка при получении данных Coinglass для %s: %s", symbol, error)
+
+async def _fetch_symbol(session, symbol, headers):
+    """Запрашивает открытый интерес и ликвидации по монете одновременно.
+
+    Ошибка одного из запросов оставляет N/A только в его полях.
+    """
+    entry = dict(_EMPTY)
+
+    overview_url = f"https://open-api.coinglass.com/api/pro/v1/futures/openInterest?symbol={symbol}"
+    liquidations_url = f"https://open-api.coinglass.com/api/pro/v1/liquidation/history?symbol={symbol}&interval=h24"
+
+    overview_data, liquidations_data = await asyncio.gather(
+        _get_json(session, overview_url, headers=headers),
+        _get_json(session, liquidations_url, headers=headers),
+        return_exceptions=True,
+    )
+
+    if isinstance(overview_data, Exception):
+        _log_coinglass_error(symbol, overview_data)
+    else:
+        try:
+            latest_data = _coinglass_record(overview_data)
+            if latest_data:
+                entry.update(
+                    volume_24h=latest_data.get("totalVolume", "N/A"),
+                    open_interest=latest_data.get("openInterest", "N/A"),
+                )
+            else:
+                logger.warning("Не удалось получить общие данные по фьючерсам для %s с Coinglass API.", symbol)
+        except Exception as e:
+            logger.error("Неожиданный формат ответа Coinglass по открытому интересу для %s: %s", symbol, e)
+
+    if isinstance(liquidations_data, Exception):
+        _log_coinglass_error(symbol, liquidations_data)
+    else:
+        try:
+            latest_liquidation_data = _coinglass_record(liquidations_data, 0)
+            if latest_liquidation_data:
+                entry.update(
+                    long_liquidations_24h=latest_liquidation_data.get("longLiquidation", "N/A"),
+                    short_liquidations_24h=latest_liquidation_data.get("shortLiquidation", "N/A"),
+                    total_liquidations_24h=latest_liquidation_data.get("totalLiquidation", "N/A"),
+                )
+            else:
+                logger.warning("Не удалось получить данные по ликвидациям для %s за 24ч с Coinglass API.", symbol)
+        except Exception as e:
+            logger.error("Неожиданный формат ответа Coinglass по ликвидациям для %s: %s", symbol, e)
+
+    return symbol, entry
+
+def _coinglass_failed(coinglass_data):
+    """Coinglass не отдал ни одного поля ни по одной монете (нет ключа или API недоступен)."""
+    return not coinglass_data or all(entry == _EMPTY for entry in coinglass_data.values())
+
+@_ttl_cached(is_failure=_coinglass_failed)
 async def fetch_coinglass_data():
-    logger.info("Попытка получить данные Coinglass через API...")
+    """Данные Coinglass по каждой монете; цены CoinGecko добавляет _with_coingecko_prices."""
+    logger.debug("Попытка получить данные Coinglass через API...")
     if not COINGLASS_API_KEY:
         logger.error("COINGLASS_API_KEY не установлен. Автоматическое получение данных Coinglass невозможно.")
         return None
 
-    symbols = ["BTC", "ETH", "XRP"]
     coinglass_data = {}
     headers = {
         "accept": "application/json",
         "coinglassSecret": COINGLASS_API_KEY
     }
 
-    coingecko_prices = await fetch_coingecko_data()
-    if not coingecko_prices:
-        logger.warning("Не удалось получить данные с CoinGecko. Цены и изменения будут отображаться как N/A.")
-        coingecko_prices = {"BTC": {"price": "N/A", "change_24h": "N/A"}, 
-                            "ETH": {"price": "N/A", "change_24h": "N/A"}, 
-                            "XRP": {"price": "N/A", "change_24h": "N/A"},
-                            "btc_dominance": "N/A"}
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        for symbol in symbols:
-            try:
-                current_price_data = coingecko_prices.get(symbol, {"price": "N/A", "change_24h": "N/A"})
-                current_price = current_price_data.get("price", "N/A")
-                change_24h = current_price_data.get("change_24h", "N/A")
+    session = _http_session()
+    results = await asyncio.gather(
+        *(
+            _fetch_symbol(session, symbol, headers)
+            for symbol in _SYMBOLS
+        ),
+        return_exceptions=True,
+    )
+
+    # Монета никогда не пропадает из поста: при любой ошибке ее поля остаются N/A
+    for symbol, result in zip(_SYMBOLS, results):
+        if isinstance(result, Exception):
+            logger.error("Неизвестная ошибка при получении данных Coinglass для %s: %s", symbol, result)
+            coinglass_data[symbol] = dict(_EMPTY)
+        else:
+            coinglass_data[symbol] = result[1]
 
-                overview_url = f"https://open-api.coinglass.com/api/pro/v1/futures/openInterest?symbol={symbol}"
-                async with session.get(overview_url) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    if data and data.get("success") and data.get("data"):
-                        latest_data = data["data"]
-                        coinglass_data[symbol] = {
-                            "current_price": current_price,
-                            "change_24h": change_24h,
-                            "volume_24h": latest_data.get("totalVolume", "N/A"),
-                            "open_interest": latest_data.get("openInterest", "N/A"),
-                            "long_liquidations_24h": "N/A",
-                            "short_liquidations_24h": "N/A",
-                            "total_liquidations_24h": "N/A"
-                        }
-                    else:
-                        logger.warning(f"Не удалось получить общие данные по фьючерсам для {symbol} с Coinglass API.")
-                        coinglass_data[symbol] = {
-                            "current_price": current_price, "change_24h": change_24h, "volume_24h": "N/A", "open_interest": "N/A",
-                            "long_liquidations_24h": "N/A", "short_liquidations_24h": "N/A", "total_liquidations_24h": "N/A"
-                        }
-
-                liquidations_url = f"https://open-api.coinglass.com/api/pro/v1/liquidation/history?symbol={symbol}&interval=h24"
-                async with session.get(liquidations_url) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    if data and data.get("success") and data.get("data"):
-                        if data["data"]:
-                            latest_liquidation_data = data["data"][0]
-                            coinglass_data[symbol]["long_liquidations_24h"] = latest_liquidation_data.get("longLiquidation", "N/A")
-                            coinglass_data[symbol]["short_liquidations_24h"] = latest_liquidation_data.get("shortLiquidation", "N/A")
-                            coinglass_data[symbol]["total_liquidations_24h"] = latest_liquidation_data.get("totalLiquidation", "N/A")
-                        else:
-                            logger.warning(f"Данные по ликвидациям для {symbol} за 24ч отсутствуют.")
-                    else:
-                        logger.warning(f"Не удалось получить данные по ликвидациям для {symbol} за 24ч с Coinglass API.")
-
-            except aiohttp.ClientError as e:
-                logger.error(f"Ошибка HTTP клиента при запросе к Coinglass API для {symbol}: {e}")
-                coinglass_data[symbol] = {
-                    "current_price": current_price, "change_24h": change_24h, "volume_24h": "N/A", "open_interest": "N/A",
-                    "long_liquidations_24h": "N/A", "short_liquidations_24h": "N/A", "total_liquidations_24h": "N/A"
-                }
-            except Exception as e:
-                logger.error(f"Неизвестная ошибка при получении данных Coinglass для {symbol}: {e}")
-                coinglass_data[symbol] = {
-                    "current_price": current_price, "change_24h": change_24h, "volume_24h": "N/A", "open_interest": "N/A",
-                    "long_liquidations_24h": "N/A", "short_liquidations_24h": "N/A", "total_liquidations_24h": "N/A"
-                }
-        
-    logger.info("Данные Coinglass успешно получены через API.")
+    logger.debug("Данные Coinglass успешно получены через API.")
     return coinglass_data
 
+def _with_coingecko_prices(coinglass_data, coingecko_data):
+    """Возвращает копию данных Coinglass с текущей ценой и изменением за 24ч из CoinGecko.
+
+    Данные Coinglass приходят из кэша, поэтому они не изменяются на месте.
+    """
+    if not coingecko_data:
+        logger.warning("Не удалось получить данные с CoinGecko. Цены и изменения будут отображаться как N/A.")
+        coingecko_data = {}
+    merged = {}
+    for symbol, entry in coinglass_data.items():
+        price_info = coingecko_data.get(symbol) or {}
+        merged[symbol] = {
+            **entry,
+            "current_price": price_info.get("price", "N/A"),
+            "change_24h": price_info.get("change_24h", "N/A"),
+        }
+    return merged
+
+@_ttl_cached()
 async def fetch_fear_greed_index():
-    logger.info("Запрос индекса страха и жадности с alternative.me...")
+    logger.debug("Запрос индекса страха и жадности с alternative.me...")
     url = "https://api.alternative.me/fng/?limit=1"
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                data = await response.json()
-                # logger.info(f"Получены данные индекса страха и жадности: {data}") # Удален подробный лог
-
-                if data and data.get("data"):
-                    latest_data = data["data"][0]
-                    return {
-                        "value": latest_data.get("value"),
-                        "value_classification": latest_data.get("value_classification"),
-                        "timestamp": latest_data.get("timestamp")
-                    }
-                return None
+        data = await _get_json(_http_session(), url)
+        # logger.info(f"Получены данные индекса страха и жадности: {data}") # Удален подробный лог
+
+        latest_data = _api_record(data, "data", 0)
+        if latest_data:
+            return {
+                "value": latest_data.get("value"),
+                "value_classification": latest_data.get("value_classification"),
+                "timestamp": latest_data.get("timestamp")
+            }
+        return None
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка HTTP клиента при запросе к alternative.me API: {e}")
+        logger.error("Ошибка HTTP клиента при запросе к alternative.me API: %s", e)
     except Exception as e:
-        logger.error(f"Неизвестная ошибка при запросе к alternative.me API: {e}")
+        logger.error("Неизвестная ошибка при запросе к alternative.me API: %s", e)
     return None
 
+@_ttl_cached()
 async def fetch_coingecko_data():
-    logger.info("Запрос данных с CoinGecko...")
+    logger.debug("Запрос данных с CoinGecko...")
     base_url_prices = "https://api.coingecko.com/api/v3/simple/price"
     params_prices = {
-        "ids": "bitcoin,ethereum,ripple",
+        "ids": ",".join(_SYMBOL_TO_CG.values()),
         "vs_currencies": "usd",
         "include_24hr_change": "true"
     }
 
     base_url_global = "https://api.coingecko.com/api/v3/global"
 
-    prices_data = None
-    global_data = None
-
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(base_url_prices, params=params_prices) as response:
-                response.raise_for_status()
-                prices_data = await response.json()
-
-            async with session.get(base_url_global) as response:
-                response.raise_for_status()
-                global_data = await response.json()
-
-        result = {
-            "BTC": {
-                "price": prices_data.get("bitcoin", {}).get("usd"),
-                "change_24h": prices_data.get("bitcoin", {}).get("usd_24h_change"),
-            },
-            "ETH": {
-                "price": prices_data.get("ethereum", {}).get("usd"),
-                "change_24h": prices_data.get("ethereum", {}).get("usd_24h_change"),
-            },
-            "XRP": {
-                "price": prices_data.get("ripple", {}).get("usd"),
-                "change_24h": prices_data.get("ripple", {}).get("usd_24h_change"),
-            },
-            "btc_dominance": global_data.get("data", {}).get("market_cap_percentage", {}).get("btc") if global_data else "N/A"
-        }
+        session = _http_session()
+        prices_data, global_data = await asyncio.gather(
+            _get_json(session, base_url_prices, params=params_prices),
+            _get_json(session, base_url_global),
+        )
+
+        result = {}
+        for symbol, coin_id in _SYMBOL_TO_CG.items():
+            coin_prices = _api_record(prices_data, coin_id) or {}
+            result[symbol] = {
+                "price": coin_prices.get("usd"),
+                "change_24h": coin_prices.get("usd_24h_change"),
+            }
+        market_cap_percentage = _api_record(global_data, "data", "market_cap_percentage")
+        result["btc_dominance"] = market_cap_percentage.get("btc") if market_cap_percentage else "N/A"
         return result
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка HTTP клиента при запросе к CoinGecko API: {e}")
+        logger.error("Ошибка HTTP клиента при запросе к CoinGecko API: %s", e)
     except Exception as e:
-        logger.error(f"Неизвестная ошибка при запросе к CoinGecko API: {e}")
+        logger.error("Неизвестная ошибка при запросе к CoinGecko API: %s", e)
     return None
 
+# --- Формирование поста ---
+# Неизменяемый текст поста собран заранее, при генерации подставляются только значения
+_POST_TEMPLATE = "📊 Дашборд — {dt} MSK\n\n{coinglass}{dominance}{fear_greed}"
+_SYMBOL_TEMPLATE = (
+    "{sym}: \n"
+    "Текущая цена: {price} {change}%\n"
+    "Объем 24ч: {vol}\n"
+    "Ликвидации 24ч (общие): {totliq}\n"
+    "Ликвидации лонг 24ч: {longliq}\n"
+    "Ликвидации шорт 24ч: {shortliq}\n"
+    "Открытый интерес (OI): {oi}\n\n"
+)
+_DOMINANCE_TEMPLATE = "Доминация BTC: {}%\n\n"
+_FEAR_GREED_TEMPLATE = "Индекс страха и жадности: {} {}\n"
+_NO_COINGLASS = "Данные Coinglass недоступны.\n\n"
+_NO_DOMINANCE = "Доминация BTC недоступна.\n\n"
+_NO_FEAR_GREED = "Индекс страха и жадности недоступен.\n"
+
+def _fmt(value):
+    if isinstance(value, (int, float)):
+        return f"{value:.2f}"
+    return "N/A" if value is None else value
+
 async def generate_dashboard_post(coinglass_data, fear_greed_data=None, coingecko_data=None):
-    logger.info("Генерация поста для дашборда...")
+    logger.debug("Генерация поста для дашборда...")
 
     if not coinglass_data and not fear_greed_data and not coingecko_data:
         return "Данные для генерации поста недоступны."
 
-    # Экранируем дату и время, так как они содержат спецсимволы MarkdownV2
-    current_datetime_str = datetime.now(MOSCOW_TZ).strftime("%Y-%m-%d %H:%M")
-    post_parts = [f"📊 Дашборд — {current_datetime_str} MSK\n"]
-
     if coinglass_data:
-        for symbol, data in coinglass_data.items():
-            post_parts.append(f"{symbol}: ")
-            price = data.get("current_price", "N/A")
-            change_24h = data.get("change_24h", "N/A")
-            
-            if isinstance(price, (int, float)) and isinstance(change_24h, (int, float)):
-                escaped_price_formatted = f"{price:.2f}"
-                escaped_change_24h_formatted = f"{change_24h:.2f}"
-                post_parts.append(f"Текущая цена: {escaped_price_formatted} {escaped_change_24h_formatted}% ")
-            else:
-                escaped_price = price
-                escaped_change_24h = change_24h
-                post_parts.append(f"Текущая цена: {escaped_price} {escaped_change_24h}%" if escaped_change_24h != 'N/A' else '')
-
-            post_parts.append(f"Объем 24ч: {data.get("volume_24h", "N/A")}")
-            post_parts.append(f"Ликвидации 24ч (общие): {data.get("total_liquidations_24h", "N/A")}")
-            post_parts.append(f"Ликвидации лонг 24ч: {data.get("long_liquidations_24h", "N/A")}")
-            post_parts.append(f"Ликвидации шорт 24ч: {data.get("short_liquidations_24h", "N/A")}")
-            post_parts.append(f"Открытый интерес (OI): {data.get("open_interest", "N/A")}\n")
+        coinglass_section = "".join(
+            _SYMBOL_TEMPLATE.format_map({
+                "sym": symbol,
+                "price": _fmt(data.get("current_price")),
+                "change": _fmt(data.get("change_24h")),
+                "vol": _fmt(data.get("volume_24h")),
+                "totliq": _fmt(data.get("total_liquidations_24h")),
+                "longliq": _fmt(data.get("long_liquidations_24h")),
+                "shortliq": _fmt(data.get("short_liquidations_24h")),
+                "oi": _fmt(data.get("open_interest")),
+            })
+            for symbol, data in coinglass_data.items()
+        )
     else:
-        post_parts.append("Данные Coinglass недоступны.\n")
+        coinglass_section = _NO_COINGLASS
 
-    if coingecko_data and coingecko_data.get("btc_dominance") is not None and coingecko_data.get("btc_dominance") != "N/A":
-        btc_dominance = coingecko_data.get("btc_dominance")
-        if isinstance(btc_dominance, (int, float)):
-            escaped_btc_dominance_formatted = f"{btc_dominance:.2f}"
-            post_parts.append(f"Доминация BTC: {escaped_btc_dominance_formatted}%\n")
-        else:
-            escaped_btc_dominance = str(btc_dominance)
-            post_parts.append(f"Доминация BTC: {escaped_btc_dominance}%\n")
+    btc_dominance = coingecko_data.get("btc_dominance") if coingecko_data else None
+    if btc_dominance is not None and btc_dominance != "N/A":
+        dominance_section = _DOMINANCE_TEMPLATE.format(_fmt(btc_dominance))
     elif coingecko_data:
-        post_parts.append("Доминация BTC недоступна.\n")
-    
-    if fear_greed_data:
-        fear_greed_value = fear_greed_data.get('value', 'N/A')
-        fear_greed_classification = fear_greed_data.get('value_classification', 'N/A')
-        post_parts.append(f"Индекс страха и жадности: {fear_greed_value} {fear_greed_classification}\n")
+        dominance_section = _NO_DOMINANCE
     else:
-        post_parts.append("Индекс страха и жадности недоступен.\n")
+        dominance_section = ""
 
-    final_post = "\n".join(post_parts)
-    logger.info("Пост для дашборда успешно сгенерирован.")
+    if fear_greed_data:
+        fear_greed_section = _FEAR_GREED_TEMPLATE.format(
+            fear_greed_data.get("value") or "N/A",
+            fear_greed_data.get("value_classification") or "N/A",
+        )
+    else:
+        fear_greed_section = _NO_FEAR_GREED
+
+    final_post = _POST_TEMPLATE.format(
+        dt=_NOW().strftime("%Y-%m-%d %H:%M"),
+        coinglass=coinglass_section,
+        dominance=dominance_section,
+        fear_greed=fear_greed_section,
+    )
+    logger.debug("Пост для дашборда успешно сгенерирован.")
     return final_post
 
+async def _send_to_channel(bot, text):
+    try:
+        await bot.send_message(chat_id=CHANNEL_ID, text=text, disable_web_page_preview=False)
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        if isinstance(retry_after, timedelta):
+            retry_after = retry_after.total_seconds()
+        logger.warning("Telegram ограничил частоту отправки, повтор через %s с.", retry_after)
+        await asyncio.sleep(retry_after)
+        await bot.send_message(chat_id=CHANNEL_ID, text=text, disable_web_page_preview=False)
+
 async def publish_post_to_channel(bot, post_text):
     max_length = 4000
     chunks = []
-    current_chunk = ""
-
-    paragraphs = post_text.split('\n\n')
-
-    for para in paragraphs:
-        if len(current_chunk) + len(para) + 2 <= max_length:
-            current_chunk += (para + '\n\n')
-        else:
-            if current_chunk:
-                chunks.append(current_chunk)
-            current_chunk = para + '\n\n'
-    if current_chunk:
-        chunks.append(current_chunk)
+    buf = []
+    size = 0
+
+    for para in post_text.split('\n\n'):
+        if not para.strip():
+            continue
+        para_len = len(para) + 2
+        if size + para_len > max_length and buf:
+            chunks.append("".join(buf))
+            buf, size = [], 0
+        if para_len > max_length:
+            # Абзац длиннее лимита Telegram режем на части по max_length символов
+            chunks.extend(para[i:i + max_length] for i in range(0, len(para), max_length))
+            continue
+        buf.append(para)
+        buf.append('\n\n')
+        size += para_len
+    if buf:
+        chunks.append("".join(buf))
 
     if not chunks:
         logger.warning("Попытка отправить пустой пост.")
         return False
 
-    for i, chunk in enumerate(chunks):
+    # Части отправляются строго по порядку; паузу задает сам Telegram через RetryAfter
+    for chunk in chunks:
         try:
-            await bot.send_message(
-                chat_id=CHANNEL_ID,
-                text=chunk.strip(),
-                disable_web_page_preview=False,
-            )
-            if i < len(chunks) - 1:
-                await asyncio.sleep(1)
+            await _send_to_channel(bot, chunk.strip())
         except Exception as e:
-            logger.error(f"Не удалось опубликовать часть поста в канал: {e}")
+            logger.error("Не удалось опубликовать часть поста в канал: %s", e)
             await bot.send_message(chat_id=ADMIN_ID, text="Не удалось отправить в канал")
             return False
     return True
 
+async def _collect_and_render(cancel_note):
+    """Собирает данные со всех API и формирует пост дашборда.
+
+    Возвращает (пост, None) либо (None, сообщение об ошибке для администратора),
+    где cancel_note — последняя фраза сообщения об ошибке.
+    """
+    if not COINGLASS_API_KEY:
+        logger.warning("COINGLASS_API_KEY не установлен. %s", cancel_note)
+        return None, (
+            "⚠️ Coinglass API не подключен!\n\n"
+            "Пожалуйста, укажите `COINGLASS_API_KEY` в файле `.env`, чтобы бот мог автоматически получать данные. "
+            f"{cancel_note}"
+        )
+
+    # Coinglass не зависит от цен CoinGecko (они подмешиваются ниже),
+    # поэтому все три источника запрашиваются одновременно
+    coinglass_data_api, coingecko_data, fear_greed_data = await _gather_or_none(
+        fetch_coinglass_data(),
+        fetch_coingecko_data(),
+        fetch_fear_greed_index(),
+    )
+
+    if coinglass_data_api is None:
+        logger.error("Ошибка при получении данных Coinglass API. %s", cancel_note)
+        return None, (
+            "❌ Ошибка Coinglass API!\n\n"
+            "При попытке получить данные с Coinglass API произошла ошибка. "
+            "Пожалуйста, проверьте логи бота для получения дополнительной информации. "
+            f"{cancel_note}"
+        )
+
+    logger.info("Данные Coinglass успешно получены через API.")
+    coinglass_data_api = _with_coingecko_prices(coinglass_data_api, coingecko_data)
+    return await generate_dashboard_post(coinglass_data_api, fear_greed_data, coingecko_data), None
+
 async def autopost_dashboard(app: Application):
     logger.info("Запуск автопостинга дашборда...")
     
@@ -283,67 +472,50 @@ async def autopost_dashboard(app: Application):
     if ADMIN_ID not in app.bot_data:
         app.bot_data[ADMIN_ID] = {}
     
-    coinglass_data_api = await fetch_coinglass_data()
-    fear_greed_data = await fetch_fear_greed_index()
-    coingecko_data = await fetch_coingecko_data() # Получаем данные CoinGecko напрямую
-
-    if COINGLASS_API_KEY is None or COINGLASS_API_KEY == "":
-        logger.warning("COINGLASS_API_KEY не установлен. Автопостинг Coinglass данных отменен. Сообщаю администратору.")
+    post_to_publish, error = await _collect_and_render("Автоматическая публикация данных Coinglass отменена.")
+    if error:
         if ADMIN_ID:
-            await bot.send_message(
-                chat_id=ADMIN_ID,
-                text=(
-                    "⚠️ Coinglass API не подключен!\n\n"
-                    "Пожалуйста, укажите `COINGLASS_API_KEY` в файле `.env`, чтобы бот мог автоматически получать данные. "
-                    "Автоматическая публикация данных Coinglass отменена." 
-                ),
-            )
+            await bot.send_message(chat_id=ADMIN_ID, text=error)
         return # Прекращаем выполнение автопостинга
-        
-    if coinglass_data_api is None:
-        logger.error("Ошибка при получении данных Coinglass API. Автопостинг Coinglass данных отменен. Сообщаю администратору.")
-        if ADMIN_ID:
-            await bot.send_message(
-                chat_id=ADMIN_ID,
-                text=(
-                    "❌ Ошибка Coinglass API!\n\n"
-                    "При попытке получить данные с Coinglass API произошла ошибка. "
-                    "Пожалуйста, проверьте логи бота для получения дополнительной информации. "
-                    "Автоматическая публикация данных Coinglass отменена." 
-                ),
-            )
-        return # Прекращаем выполнение автопостинга
-    else:
-        logger.info("Данные Coinglass успешно получены через API. Автопостинг продолжается.")
-        post_to_publish = await generate_dashboard_post(coinglass_data_api, fear_greed_data, coingecko_data)
 
     if post_to_publish:
         if await publish_post_to_channel(bot, post_to_publish):
-            logger.info(f"Пост дашборда опубликован для админа {ADMIN_ID}.")
+            logger.info("Пост дашборда опубликован для админа %s.", ADMIN_ID)
         else:
-            logger.error(f"Ошибка при публикации поста дашборда для админа {ADMIN_ID}.")
+            logger.error("Ошибка при публикации поста дашборда для админа %s.", ADMIN_ID)
     else:
-        logger.warning(f"Не удалось сгенерировать пост дашборда для админа {ADMIN_ID}.")
+        logger.warning("Не удалось сгенерировать пост дашборда для админа %s.", ADMIN_ID)
     
     logger.info("Автопостинг дашборда завершен.")
 
 async def on_startup(app: Application):
     logger.info("Dashboard бот запускается...")
     scheduler = AsyncIOScheduler(timezone=MOSCOW_TZ)
-    # scheduler.add_job(
-    #     autopost_dashboard,
-    #     "cron",
-    #     hour=8,
-    #     minute=0,
-    #     timezone=MOSCOW_TZ,
-    #     args=(app,)
-    # )
+    scheduler.add_job(
+        autopost_dashboard,
+        "cron",
+        hour=8,
+        minute=0,
+        timezone=MOSCOW_TZ,
+        args=(app,),
+        misfire_grace_time=3600,  # пропущенный запуск выполняется, если бот поднялся в течение часа
+        coalesce=True,
+        max_instances=1,
+    )
     scheduler.start()
     app.bot_data["scheduler"] = scheduler
+    _http_session()
     if ADMIN_ID not in app.bot_data:
         app.bot_data[ADMIN_ID] = {}
     logger.info("Планировщик дашборда запущен.")
 
+async def on_shutdown(app: Application):
+    global _HTTP
+    if _HTTP is not None and not _HTTP.closed:
+        await _HTTP.close()
+    _HTTP = None
+    logger.info("HTTP-сессия закрыта.")
+
 # --- Команды ---
 async def handle_non_admin_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
@@ -360,31 +532,10 @@ async def test_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text("Начинаю тестовый сбор статистики и формирование отчета...")
     
-    # Имитируем логику autopost_dashboard для тестового отчета
-    coinglass_data_api = await fetch_coinglass_data()
-    fear_greed_data = await fetch_fear_greed_index()
-    coingecko_data = await fetch_coingecko_data() # Получаем данные CoinGecko напрямую
-
-    if COINGLASS_API_KEY is None or COINGLASS_API_KEY == "":
-        logger.warning("COINGLASS_API_KEY не установлен при выполнении /test. Отправка тестового поста Coinglass данных отменена. Сообщаю администратору.")
-        await update.message.reply_text(
-            "⚠️ Coinglass API не подключен!\n\n"
-            "Пожалуйста, укажите `COINGLASS_API_KEY` в файле `.env`, чтобы бот мог автоматически получать данные. "
-            "Отправка тестового поста Coinglass данных отменена." 
-        )
+    post_to_send, error = await _collect_and_render("Отправка тестового поста Coinglass данных отменена.")
+    if error:
+        await update.message.reply_text(error)
         return # Прекращаем выполнение команды /test
-    elif coinglass_data_api is None:
-        logger.error("Ошибка при получении данных Coinglass API при выполнении /test. Отправка тестового поста Coinglass данных отменена. Сообщаю администратору.")
-        await update.message.reply_text(
-            "❌ Ошибка Coinglass API!\n\n"
-            "При попытке получить данные с Coinglass API произошла ошибка. "
-            "Пожалуйста, проверьте логи бота для получения дополнительной информации. "
-            "Отправка тестового поста Coinglass данных отменена." 
-        )
-        return # Прекращаем выполнение команды /test
-    else:
-        logger.info("Данные Coinglass успешно получены через API для /test. Продолжаю.")
-        post_to_send = await generate_dashboard_post(coinglass_data_api, fear_greed_data, coingecko_data)
 
     if post_to_send:
         try:
@@ -396,10 +547,10 @@ async def test_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             logger.info("Тестовый пост дашборда успешно отправлен админу.")
             await update.message.reply_text("Тестовый пост со статистикой успешно отправлен вам.")
         except Exception as e:
-            logger.error(f"Не удалось отправить тестовый пост админу: {e}")
+            logger.error("Не удалось отправить тестовый пост админу: %s", e)
             await update.message.reply_text(f"Ошибка при отправке тестового поста: {e}")
     else:
-        logger.warning(f"Не удалось сгенерировать пост дашборда для админа {ADMIN_ID}.")
+        logger.warning("Не удалось сгенерировать пост дашборда для админа %s.", ADMIN_ID)
         await update.message.reply_text("Не удалось подготовить тестовый пост дашборда.")
 
 async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -410,41 +561,12 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text("Начинаю сбор статистики и формирование отчета для немедленной публикации...")
 
-    # Имитируем логику autopost_dashboard для немедленной публикации
     bot = context.bot # Для publish_post_to_channel
-    
-    coinglass_data_api = await fetch_coinglass_data()
-    fear_greed_data = await fetch_fear_greed_index()
-    coingecko_data = await fetch_coingecko_data() # Получаем данные CoinGecko напрямую
-
-    post_to_publish = None
-
-    if COINGLASS_API_KEY is None or COINGLASS_API_KEY == "":
-        logger.warning("COINGLASS_API_KEY не установлен при выполнении /report. Публикация Coinglass данных отменена. Сообщаю администратору.")
-        await bot.send_message(
-            chat_id=ADMIN_ID,
-            text=(
-                "⚠️ Coinglass API не подключен!\n\n"
-                "Пожалуйста, укажите `COINGLASS_API_KEY` в файле `.env`, чтобы бот мог автоматически получать данные. "
-                "Публикация Coinglass данных отменена."
-            ),
-        )
-        return # Прекращаем выполнение команды /report
-    elif coinglass_data_api is None:
-        logger.error("Ошибка при получении данных Coinglass API при выполнении /report. Публикация Coinglass данных отменена. Сообщаю администратору.")
-        await bot.send_message(
-            chat_id=ADMIN_ID,
-            text=(
-                "❌ Ошибка Coinglass API!\n\n"
-                "При попытке получить данные с Coinglass API произошла ошибка. "
-                "Пожалуйста, проверьте логи бота для получения дополнительной информации. "
-                "Публикация Coinglass данных отменена."
-            ),
-        )
+
+    post_to_publish, error = await _collect_and_render("Публикация Coinglass данных отменена.")
+    if error:
+        await bot.send_message(chat_id=ADMIN_ID, text=error)
         return # Прекращаем выполнение команды /report
-    else:
-        logger.info("Данные Coinglass успешно получены через API для /report. Продолжаю.")
-        post_to_publish = await generate_dashboard_post(coinglass_data_api, fear_greed_data, coingecko_data)
 
     if post_to_publish:
         if await publish_post_to_channel(bot, post_to_publish):
@@ -454,7 +576,7 @@ async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             logger.error("Ошибка при публикации поста дашборда в канал по команде /report.")
             await update.message.reply_text("Пост по дашборду сгенерирован, но не удалось опубликовать в канал. Смотри логи.")
     else:
-        logger.warning(f"Не удалось сгенерировать пост дашборда для канала {CHANNEL_ID}.")
+        logger.warning("Не удалось сгенерировать пост дашборда для канала %s.", CHANNEL_ID)
         await update.message.reply_text("Не удалось подготовить пост по дашборду для публикации.")
 
 async def report_admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -474,63 +596,45 @@ async def report_admin_command(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data["waiting_for_manual_coinglass_input_channel"] = True
     logger.info("Запрос на ручной ввод Coinglass данных отправлен администратору через команду /report_admin.")
 
+# Формат ручного ввода: "BTC: TV=X, TL=Y, LL=A, SL=B, OI=C; ETH: ..."
+_COIN_RE = re.compile(r"\b(BTC|ETH|XRP)\s*:\s*([^;]*?)(?=\b(?:BTC|ETH|XRP)\s*:|;|$)", re.IGNORECASE | re.DOTALL)
+_KV_RE = re.compile(r"\b(TV|TL|LL|SL|OI)\s*=\s*([^,;]*?)\s*(?=[,;]|$)", re.IGNORECASE)
+
 async def handle_admin_manual_coinglass_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
+    # Сообщения сюда приходят только от администратора (filters.User(ADMIN_ID) в main)
     # Проверяем флаг ожидания ручного ввода для публикации в канал
-    if update.effective_user.id == ADMIN_ID and context.user_data.get("waiting_for_manual_coinglass_input_channel"):
+    if context.user_data.get("waiting_for_manual_coinglass_input_channel"):
         target_chat_id = CHANNEL_ID
         context.user_data["waiting_for_manual_coinglass_input_channel"] = False
     # Проверяем флаг ожидания ручного ввода для отправки админу (тест)
-    elif update.effective_user.id == ADMIN_ID and context.user_data.get("waiting_for_manual_coinglass_input_admin"):
+    elif context.user_data.get("waiting_for_manual_coinglass_input_admin"):
         target_chat_id = ADMIN_ID
         context.user_data["waiting_for_manual_coinglass_input_admin"] = False
     else:
-        return # Не админ или не ждали ручного ввода
+        return # Ручной ввод не ожидался
 
     await update.message.reply_text("Получил данные Coinglass, начинаю обработку...")
     coinglass_input_text = update.message.text
     
     coinglass_parsed_data = {}
     if coinglass_input_text.strip().lower() != "n/a":
-        coins_data_str = coinglass_input_text.split(';')
-        for coin_str in coins_data_str:
-            if ':' in coin_str:
-                coin_name, details_str = coin_str.split(':', 1)
-                coin_name = coin_name.strip().upper()
-                details = {}
-                parts = details_str.split(',')
-                for part in parts:
-                    if '=' in part:
-                        key, value = part.split('=', 1)
-                        details[key.strip()] = value.strip()
-                if coin_name in ["BTC", "ETH", "XRP"]:
-                    coinglass_parsed_data[coin_name] = {
-                        "volume_24h": details.get("TV", "N/A"),
-                        "total_liquidations_24h": details.get("TL", "N/A"),
-                        "long_liquidations_24h": details.get("LL", "N/A"),
-                        "short_liquidations_24h": details.get("SL", "N/A"),
-                        "open_interest": details.get("OI", "N/A")
-                    }
+        for coin_match in _COIN_RE.finditer(coinglass_input_text):
+            details = {key.upper(): value for key, value in _KV_RE.findall(coin_match.group(2))}
+            coinglass_parsed_data[coin_match.group(1).upper()] = {
+                "volume_24h": details.get("TV", "N/A"),
+                "total_liquidations_24h": details.get("TL", "N/A"),
+                "long_liquidations_24h": details.get("LL", "N/A"),
+                "short_liquidations_24h": details.get("SL", "N/A"),
+                "open_interest": details.get("OI", "N/A")
+            }
     
-    # Получаем цены с CoinGecko и объединяем с ручными данными
-    coingecko_prices = await fetch_coingecko_data()
-    if not coingecko_prices:
-        logger.warning("Не удалось получить текущие цены с CoinGecko. Цены будут отображаться как N/A.")
-        coingecko_prices = {"BTC": "N/A", "ETH": "N/A", "XRP": "N/A"}
-
-    # Добавляем цены CoinGecko к данным, введенным вручную
-    for symbol in ["BTC", "ETH", "XRP"]:
-        if symbol not in coinglass_parsed_data:
-            coinglass_parsed_data[symbol] = {}
-        coinglass_parsed_data[symbol]["current_price"] = coingecko_prices.get(symbol, "N/A")
-
-    # Получаем индекс страха и жадности
-    fear_greed_data = await fetch_fear_greed_index()
+    # Получаем данные CoinGecko и индекс страха и жадности одним параллельным запросом
+    coingecko_data, fear_greed_data = await _gather_or_none(
+        fetch_coingecko_data(),
+        fetch_fear_greed_index(),
+    )
     if not fear_greed_data:
         logger.warning("Не удалось получить индекс страха и жадности.")
-
-    # Получаем данные CoinGecko напрямую для ручного ввода
-    coingecko_data = await fetch_coingecko_data()
     if not coingecko_data:
         logger.warning("Не удалось получить данные с CoinGecko для ручного ввода. Цены и изменения будут отображаться как N/A.")
         coingecko_data = {"BTC": {"price": "N/A", "change_24h": "N/A"}, 
@@ -538,6 +642,14 @@ async def handle_admin_manual_coinglass_input(update: Update, context: ContextTy
                             "XRP": {"price": "N/A", "change_24h": "N/A"},
                             "btc_dominance": "N/A"}
 
+    # Добавляем цены CoinGecko к данным, введенным вручную
+    for symbol in _SYMBOLS:
+        if symbol not in coinglass_parsed_data:
+            coinglass_parsed_data[symbol] = {}
+        price_info = coingecko_data.get(symbol, {})
+        coinglass_parsed_data[symbol]["current_price"] = price_info.get("price", "N/A")
+        coinglass_parsed_data[symbol]["change_24h"] = price_info.get("change_24h", "N/A")
+
     post_to_publish = await generate_dashboard_post(coinglass_parsed_data, fear_greed_data, coingecko_data)
 
     if post_to_publish:
@@ -558,7 +670,7 @@ async def handle_admin_manual_coinglass_input(update: Update, context: ContextTy
                 logger.info("Тестовый пост дашборда с ручными данными успешно отправлен админу.")
                 await update.message.reply_text("Тестовый пост со статистикой с ручными данными Coinglass успешно отправлен вам.")
         except Exception as e:
-            logger.error(f"Не удалось отправить пост с ручными данными: {e}")
+            logger.error("Не удалось отправить пост с ручными данными: %s", e)
             await update.message.reply_text(f"Ошибка при отправке поста с ручными данными: {e}")
     else:
         logger.warning("Не удалось сгенерировать пост дашборда с учетом ручных данных.")
@@ -586,7 +698,16 @@ def main():
         logger.error("Необходимо указать TELEGRAM_BOT_TOKEN, CHANNEL_ID и ADMIN_ID в .env")
         return
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(on_startup).build()
+    # uvloop (если установлен) заметно ускоряет сетевой ввод-вывод asyncio
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("uvloop не установлен, используется стандартный цикл событий asyncio.")
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Используется цикл событий uvloop.")
+
+    application = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown).build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("report", report_command))
@@ -595,15 +716,13 @@ def main():
     application.add_handler(CommandHandler("report_admin_test", report_admin_test_command))
 
     # Обработчик для ручного ввода Coinglass данных администратором
-    application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND) & filters.User(ADMIN_ID), handle_admin_manual_coinglass_input))
-    # Обработчик для всех остальных сообщений
-    application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_non_admin_messages))
+    application.add_handler(MessageHandler(filters.User(ADMIN_ID) & filters.TEXT & ~filters.COMMAND, handle_admin_manual_coinglass_input))
     # Обработчик для всех остальных сообщений, включая медиа, для не-админов
-    application.add_handler(MessageHandler(~filters.User(ADMIN_ID) & filters.ALL, handle_non_admin_messages))
+    application.add_handler(MessageHandler(~filters.User(ADMIN_ID), handle_non_admin_messages))
 
 
-    logger.info(f"Версия Python-Telegram-Bot: {telegram.__version__}")
-    logger.info(f"{BOT_NAME} запущен...")
+    logger.info("Версия Python-Telegram-Bot: %s", telegram.__version__)
+    logger.info("%s запущен...", BOT_NAME)
     application.run_polling(drop_pending_updates=True)
 
 if __name__ == "__main__":